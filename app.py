@@ -1,9 +1,21 @@
 import os
-import time
+
+# Optional gevent cooperative I/O — must patch before requests/threading load
+if os.getenv("USE_GEVENT", "0") == "1":
+    from gevent import monkey
+
+    monkey.patch_all()
+
+import hmac
+import json
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+import orjson
 import requests
-from flask import Flask, request, jsonify
-from threading import Thread
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from flask import Flask, Response, request, jsonify
 
 # --- Import configuration from secrets.py ---
 from secrets import (
@@ -26,6 +38,92 @@ logger = logging.getLogger("vercel-app")
 # Mode control
 LOCAL_MODE = os.getenv("LOCAL_MODE", "false").lower() == "true"
 
+# Local pipeline is imported once at startup, and only in local mode, so
+# Vercel never loads subprocess logic.
+run_local_pipeline = None
+if LOCAL_MODE:
+    try:
+        from app_local_pipeline import run_local_pipeline
+    except ImportError as e:
+        logger.error("Missing app_local_pipeline.py: %s", e)
+
+# Shared HTTP session (keep-alive connection pooling + jittered backoff retries)
+NOTIFY_MAX_ATTEMPTS = 6
+NOTIFY_RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+NOTIFY_RETRY_DEADLINE = 60  # seconds of retrying allowed after the first failure
+
+
+class DeadlineRetry(Retry):
+    """Retry that also gives up once a monotonic deadline has passed.
+
+    The deadline is stamped on the first retry (the adapter's instance is
+    shared, so it never carries one) and backoff sleeps are capped to the
+    time remaining.
+    """
+
+    def __init__(self, *args, deadline_seconds=None, deadline=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.deadline_seconds = deadline_seconds
+        self.deadline = deadline
+
+    def new(self, **kw):
+        deadline = self.deadline
+        if deadline is None and self.deadline_seconds is not None:
+            deadline = time.monotonic() + self.deadline_seconds
+        kw.setdefault("deadline_seconds", self.deadline_seconds)
+        kw.setdefault("deadline", deadline)
+        return super().new(**kw)
+
+    def _remaining(self):
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def is_exhausted(self):
+        remaining = self._remaining()
+        return super().is_exhausted() or (remaining is not None and remaining <= 0)
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        remaining = self._remaining()
+        if remaining is None:
+            return backoff
+        return max(0.0, min(backoff, remaining))
+
+
+_retry = DeadlineRetry(
+    total=NOTIFY_MAX_ATTEMPTS - 1,
+    backoff_factor=0.5,
+    backoff_jitter=0.25,
+    status_forcelist=NOTIFY_RETRY_STATUSES,
+    allowed_methods=["POST"],
+    raise_on_status=False,
+    # Retry-After is uncapped in urllib3; a hostile value would stall the ack
+    respect_retry_after_header=False,
+    deadline_seconds=NOTIFY_RETRY_DEADLINE,
+)
+HTTP = requests.Session()
+HTTP.headers.update({"User-Agent": "deployer/1.0"})
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=_retry)
+HTTP.mount("http://", _adapter)
+HTTP.mount("https://", _adapter)
+
+# Fields every /api task must carry
+REQUIRED_FIELDS = frozenset(
+    ["email", "secret", "task", "round", "nonce", "brief", "evaluation_url"]
+)
+
+# Accepted "round" values (keeps the echoed ack within orjson's int64 range)
+MAX_ROUND = 2**31 - 1
+
+# Bounded pool for background pipelines (bounded concurrency; excess tasks queue).
+# Unlike the old daemon threads, the workers are joined at interpreter exit and
+# drain the whole queue first, so shutdown waits for every accepted pipeline.
+EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("WORKER_CONCURRENCY", "4")),
+    thread_name_prefix="pipeline",
+)
+
 
 # --- Helper: Simulated Repo Creation for Vercel ---
 def fake_create_repo(task, brief, attachments):
@@ -38,47 +136,87 @@ def fake_create_repo(task, brief, attachments):
 
 
 # --- Helper: Notify evaluation server with retries ---
-def notify_evaluation(evaluation_url: str, payload: dict, max_attempts: int = 6):
+def notify_evaluation(evaluation_url: str, payload: dict):
+    """POST payload to the evaluation server; retries/backoff happen in HTTP's adapter."""
     logger.info(f"Notifying evaluation server at {evaluation_url}")
     headers = {"Content-Type": "application/json"}
 
-    for attempt in range(1, max_attempts + 1):
-        try:
-            resp = requests.post(
-                evaluation_url, json=payload, headers=headers, timeout=10
-            )
-            if resp.status_code == 200:
-                logger.info(f"✅ Evaluation notified successfully (attempt {attempt})")
-                return True
-            else:
-                logger.warning(f"⚠️ Attempt {attempt}: Received {resp.status_code}")
-        except Exception as e:
-            logger.warning(f"⚠️ Attempt {attempt} failed: {e}")
-        time.sleep(2**attempt)
-    logger.error("❌ All retries failed notifying evaluation server.")
+    try:
+        resp = HTTP.post(evaluation_url, json=payload, headers=headers, timeout=10)
+    except requests.RequestException as e:
+        logger.error(f"❌ All retries failed notifying evaluation server: {e}")
+        return False
+    if resp.status_code == 200:
+        logger.info("✅ Evaluation notified successfully")
+        return True
+    if resp.status_code in NOTIFY_RETRY_STATUSES:
+        logger.error(f"❌ Evaluation server responded {resp.status_code} after retries.")
+    else:
+        logger.error(f"❌ Evaluation server responded {resp.status_code} (not retryable).")
     return False
 
 
+# --- Helper: Fast JSON response ---
+def json_response(obj, status: int = 200):
+    """Serialize obj with orjson (bypasses Flask's jsonify)."""
+    return Response(orjson.dumps(obj), status=status, mimetype="application/json")
+
+
+# --- Helper: Decode request body for orjson ---
+def load_json_body(raw: bytes):
+    """Parse with orjson, accepting BOM/UTF-16/UTF-32 bodies like request.get_json."""
+    encoding = json.detect_encoding(raw)
+    if encoding != "utf-8":
+        raw = raw.decode(encoding)
+    return orjson.loads(raw)
+
+
 # --- Flask Endpoints ---
 
 
 @app.route("/api", methods=["POST"])
 def api_handler():
     """Main API endpoint for accepting LLM deployment tasks."""
-    data = request.get_json(silent=True)
-    if not data:
-        return jsonify({"error": "invalid json"}), 400
+    if not request.is_json:
+        return json_response({"error": "invalid json"}, 400)
+    try:
+        data = load_json_body(request.get_data())
+    except ValueError:  # orjson.JSONDecodeError, UnicodeDecodeError
+        data = None
+    if not data or not isinstance(data, dict):
+        return json_response({"error": "invalid json"}, 400)
 
     # Basic validation
-    if data.get("secret") != PROJECT_SECRET:
+    secret = data.get("secret")
+    if (
+        PROJECT_SECRET is None
+        or not isinstance(secret, str)
+        or not hmac.compare_digest(
+            secret.encode("utf-8"), PROJECT_SECRET.encode("utf-8")
+        )
+    ):
         logger.warning("Invalid secret received.")
-        return jsonify({"error": "invalid secret"}), 400
+        return json_response({"error": "invalid secret"}, 400)
+
+    missing = REQUIRED_FIELDS - data.keys()
+    if missing:
+        return json_response(
+            {"error": "missing fields", "missing": sorted(missing)}, 400
+        )
+
+    task = data["task"]
+    if not isinstance(task, str):
+        return json_response({"error": "invalid task"}, 400)
+    try:
+        round_idx = int(data["round"])
+    except (TypeError, ValueError, OverflowError):
+        round_idx = None
+    if round_idx is None or not 1 <= round_idx <= MAX_ROUND:
+        return json_response({"error": "invalid round"}, 400)
 
-    task = data.get("task", "untitled")
-    brief = data.get("brief", "")
-    evaluation_url = data.get("evaluation_url", "")
+    brief = data["brief"]
+    evaluation_url = data["evaluation_url"]
     attachments = data.get("attachments", [])
-    round_idx = int(data.get("round", 1))
 
     ack = {"status": "ok", "task": task, "round": round_idx}
     logger.info(
@@ -87,36 +225,34 @@ def api_handler():
 
     if LOCAL_MODE:
         # Local mode → use real git + gh pipeline
-        Thread(target=_do_pipeline_local, args=(data,), daemon=True).start()
+        EXECUTOR.submit(_do_pipeline_local, data)
     else:
         # Vercel mode → simulate repo + page creation
         repo_url, pages_url = fake_create_repo(task, brief, attachments)
         payload = {
-            "email": data.get("email"),
+            "email": data["email"],
             "task": task,
             "round": round_idx,
-            "nonce": data.get("nonce"),
+            "nonce": data["nonce"],
             "repo_url": repo_url,
             "commit_sha": "mock-sha123",
             "pages_url": pages_url,
         }
         notify_evaluation(evaluation_url, payload)
 
-    return jsonify(ack), 200
+    return json_response(ack)
 
 
 def _do_pipeline_local(data: dict):
     """
     Local-only pipeline runner.
-    This dynamically imports app_local_pipeline.py to avoid loading subprocess
-    logic in Vercel mode.
+    Uses run_local_pipeline imported at startup when LOCAL_MODE is set.
     """
+    if run_local_pipeline is None:
+        logger.error("Local pipeline unavailable; skipping task.")
+        return
     try:
-        from app_local_pipeline import run_local_pipeline
-
         run_local_pipeline(data)
-    except ImportError as e:
-        logger.error("Missing app_local_pipeline.py: %s", e)
     except Exception as e:
         logger.exception("Error running local pipeline: %s", e)
 
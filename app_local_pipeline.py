@@ -13,9 +13,12 @@ Features:
 """
 
 import os
-import time
+import hmac
 import logging
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from flask import Flask, request, jsonify
 from threading import Thread
 
@@ -40,6 +43,67 @@ logger = logging.getLogger("vercel-app")
 # Mode control
 LOCAL_MODE = os.getenv("LOCAL_MODE", "false").lower() == "true"
 
+# Shared HTTP session (keep-alive connection pooling + jittered backoff retries)
+NOTIFY_MAX_ATTEMPTS = 6
+NOTIFY_RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+NOTIFY_RETRY_DEADLINE = 60  # seconds of retrying allowed after the first failure
+
+
+class DeadlineRetry(Retry):
+    """Retry that also gives up once a monotonic deadline has passed.
+
+    The deadline is stamped on the first retry (the adapter's instance is
+    shared, so it never carries one) and backoff sleeps are capped to the
+    time remaining.
+    """
+
+    def __init__(self, *args, deadline_seconds=None, deadline=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.deadline_seconds = deadline_seconds
+        self.deadline = deadline
+
+    def new(self, **kw):
+        deadline = self.deadline
+        if deadline is None and self.deadline_seconds is not None:
+            deadline = time.monotonic() + self.deadline_seconds
+        kw.setdefault("deadline_seconds", self.deadline_seconds)
+        kw.setdefault("deadline", deadline)
+        return super().new(**kw)
+
+    def _remaining(self):
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def is_exhausted(self):
+        remaining = self._remaining()
+        return super().is_exhausted() or (remaining is not None and remaining <= 0)
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        remaining = self._remaining()
+        if remaining is None:
+            return backoff
+        return max(0.0, min(backoff, remaining))
+
+
+_retry = DeadlineRetry(
+    total=NOTIFY_MAX_ATTEMPTS - 1,
+    backoff_factor=0.5,
+    backoff_jitter=0.25,
+    status_forcelist=NOTIFY_RETRY_STATUSES,
+    allowed_methods=["POST"],
+    raise_on_status=False,
+    # Retry-After is uncapped in urllib3; a hostile value would stall the ack
+    respect_retry_after_header=False,
+    deadline_seconds=NOTIFY_RETRY_DEADLINE,
+)
+HTTP = requests.Session()
+HTTP.headers.update({"User-Agent": "deployer/1.0"})
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=_retry)
+HTTP.mount("http://", _adapter)
+HTTP.mount("https://", _adapter)
+
 
 # --- Helper: Simulated Repo Creation for Vercel ---
 def fake_create_repo(task, brief, attachments):
@@ -52,24 +116,23 @@ def fake_create_repo(task, brief, attachments):
 
 
 # --- Helper: Notify evaluation server with retries ---
-def notify_evaluation(evaluation_url: str, payload: dict, max_attempts: int = 6):
+def notify_evaluation(evaluation_url: str, payload: dict):
+    """POST payload to the evaluation server; retries/backoff happen in HTTP's adapter."""
     logger.info(f"Notifying evaluation server at {evaluation_url}")
     headers = {"Content-Type": "application/json"}
 
-    for attempt in range(1, max_attempts + 1):
-        try:
-            resp = requests.post(
-                evaluation_url, json=payload, headers=headers, timeout=10
-            )
-            if resp.status_code == 200:
-                logger.info(f"✅ Evaluation notified successfully (attempt {attempt})")
-                return True
-            else:
-                logger.warning(f"⚠️ Attempt {attempt}: Received {resp.status_code}")
-        except Exception as e:
-            logger.warning(f"⚠️ Attempt {attempt} failed: {e}")
-        time.sleep(2**attempt)
-    logger.error("❌ All retries failed notifying evaluation server.")
+    try:
+        resp = HTTP.post(evaluation_url, json=payload, headers=headers, timeout=10)
+    except requests.RequestException as e:
+        logger.error(f"❌ All retries failed notifying evaluation server: {e}")
+        return False
+    if resp.status_code == 200:
+        logger.info("✅ Evaluation notified successfully")
+        return True
+    if resp.status_code in NOTIFY_RETRY_STATUSES:
+        logger.error(f"❌ Evaluation server responded {resp.status_code} after retries.")
+    else:
+        logger.error(f"❌ Evaluation server responded {resp.status_code} (not retryable).")
     return False
 
 
@@ -84,7 +147,14 @@ def api_handler():
         return jsonify({"error": "invalid json"}), 400
 
     # Basic validation
-    if data.get("secret") != PROJECT_SECRET:
+    secret = data.get("secret")
+    if (
+        PROJECT_SECRET is None
+        or not isinstance(secret, str)
+        or not hmac.compare_digest(
+            secret.encode("utf-8"), PROJECT_SECRET.encode("utf-8")
+        )
+    ):
         logger.warning("Invalid secret received.")
         return jsonify({"error": "invalid secret"}), 400
 
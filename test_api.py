@@ -0,0 +1,297 @@
+# test_api.py
+import http.server
+import json
+import secrets
+import threading
+import time
+import pytest
+from unittest.mock import patch
+
+# app.py reads its config from a local secrets.py; provide it on the
+# stdlib module so the import works without one.
+for _name, _value in {
+    "PROJECT_SECRET": "s3cret",
+    "GITHUB_USER": "octocat",
+    "GIT_AUTHOR_NAME": None,
+    "GIT_AUTHOR_EMAIL": None,
+    "PAGES_POLL_TIMEOUT": 180,
+    "PAGES_POLL_INTERVAL": 3,
+    "WORK_DIR": "./work",
+}.items():
+    if not hasattr(secrets, _name):
+        setattr(secrets, _name, _value)
+
+import app as app_module  # noqa: E402
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app_module, "PROJECT_SECRET", "s3cret")
+    monkeypatch.setattr(app_module, "LOCAL_MODE", False)
+    with patch("app.notify_evaluation") as mock_notify:
+        mock_notify.return_value = True
+        client = app_module.app.test_client()
+        client.mock_notify = mock_notify
+        yield client
+
+
+def make_task(**overrides):
+    data = {
+        "email": "a@b.com",
+        "secret": "s3cret",
+        "task": "Task1",
+        "round": 1,
+        "nonce": "n1",
+        "brief": "Some brief",
+        "evaluation_url": "http://eval",
+        "attachments": [],
+    }
+    data.update(overrides)
+    return data
+
+
+# -------------------
+# Test body parsing
+# -------------------
+
+
+@pytest.mark.parametrize("body", [b"not json", b"[1, 2]", b'"str"', b"1", b"{}"])
+def test_invalid_or_non_object_body(client, body):
+    resp = client.post("/api", data=body, content_type="application/json")
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "invalid json"}
+
+
+@pytest.mark.parametrize("encoding", ["utf-8-sig", "utf-16", "utf-32"])
+def test_bom_and_utf16_bodies_accepted(client, encoding):
+    body = json.dumps(make_task()).encode(encoding)
+    resp = client.post("/api", data=body, content_type="application/json")
+    assert resp.status_code == 200
+
+
+# -------------------
+# Test secret check
+# -------------------
+
+
+def test_valid_request_acks_and_notifies(client):
+    resp = client.post("/api", json=make_task())
+    assert resp.status_code == 200
+    assert resp.get_json() == {"status": "ok", "task": "Task1", "round": 1}
+    client.mock_notify.assert_called_once()
+    args, kwargs = client.mock_notify.call_args
+    assert args[0] == "http://eval"
+    assert args[1]["nonce"] == "n1"
+
+
+def test_wrong_secret_rejected(client):
+    resp = client.post("/api", json=make_task(secret="nope"))
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "invalid secret"}
+    client.mock_notify.assert_not_called()
+
+
+def test_missing_secret_reports_invalid_secret_not_schema(client):
+    data = make_task()
+    del data["secret"]
+    del data["nonce"]
+    resp = client.post("/api", json=data)
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "invalid secret"}
+
+
+def test_non_string_secret_rejected(client, monkeypatch):
+    monkeypatch.setattr(app_module, "PROJECT_SECRET", "123")
+    resp = client.post("/api", json=make_task(secret=123))
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "invalid secret"}
+
+
+@pytest.mark.parametrize("secret", [None, 0, False, []])
+def test_falsy_secret_does_not_match_empty_project_secret(client, monkeypatch, secret):
+    monkeypatch.setattr(app_module, "PROJECT_SECRET", "")
+    resp = client.post("/api", json=make_task(secret=secret))
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "invalid secret"}
+
+
+def test_unset_project_secret_rejects_everything(client, monkeypatch):
+    monkeypatch.setattr(app_module, "PROJECT_SECRET", None)
+    resp = client.post("/api", json=make_task(secret=None))
+    assert resp.status_code == 400
+
+
+def test_non_ascii_secret_compared_safely(client, monkeypatch):
+    monkeypatch.setattr(app_module, "PROJECT_SECRET", "sécret")
+    assert client.post("/api", json=make_task(secret="sécret")).status_code == 200
+    assert client.post("/api", json=make_task(secret="secret")).status_code == 400
+
+
+def test_local_mode_submits_pipeline_to_executor(client, monkeypatch):
+    monkeypatch.setattr(app_module, "LOCAL_MODE", True)
+    with patch.object(app_module.EXECUTOR, "submit") as mock_submit:
+        resp = client.post("/api", json=make_task())
+    assert resp.status_code == 200
+    mock_submit.assert_called_once_with(app_module._do_pipeline_local, make_task())
+    client.mock_notify.assert_not_called()
+
+
+# -------------------
+# Test required fields
+# -------------------
+
+
+def test_missing_fields_listed_sorted(client):
+    data = make_task()
+    for k in ("nonce", "brief", "email"):
+        del data[k]
+    resp = client.post("/api", json=data)
+    assert resp.status_code == 400
+    assert resp.get_json() == {
+        "error": "missing fields",
+        "missing": ["brief", "email", "nonce"],
+    }
+    client.mock_notify.assert_not_called()
+
+
+# -------------------
+# Test notify_evaluation logging
+# -------------------
+
+
+@pytest.mark.parametrize(
+    "status, expected",
+    [(503, "after retries"), (404, "not retryable"), (201, "not retryable")],
+)
+def test_notify_failure_log_distinguishes_retried_statuses(caplog, status, expected):
+    with patch.object(app_module.HTTP, "post") as mock_post:
+        mock_post.return_value.status_code = status
+        assert app_module.notify_evaluation("http://eval", {}) is False
+    assert expected in caplog.text
+
+
+def test_notify_adapter_retry_settings():
+    retry = app_module.HTTP.get_adapter("https://eval.example").max_retries
+    assert retry is app_module.HTTP.get_adapter("http://eval.example").max_retries
+    assert retry.total == app_module.NOTIFY_MAX_ATTEMPTS - 1 == 5
+    assert set(retry.status_forcelist) == {429, 500, 502, 503, 504}
+    assert set(retry.allowed_methods) == {"POST"}
+    assert retry.respect_retry_after_header is False
+    assert retry.raise_on_status is False
+    assert retry.deadline_seconds == app_module.NOTIFY_RETRY_DEADLINE
+    # The shared instance must not carry a deadline; it is stamped per request
+    assert retry.deadline is None
+
+
+def test_retry_deadline_exhausts_and_caps_backoff(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(app_module.time, "monotonic", lambda: now[0])
+    retry = app_module._retry.new()
+    assert retry.deadline == 1000.0 + app_module.NOTIFY_RETRY_DEADLINE
+    assert retry.new().deadline == retry.deadline
+    assert not retry.is_exhausted()
+
+    now[0] = retry.deadline - 0.1
+    assert retry.get_backoff_time() <= 0.1
+    now[0] = retry.deadline
+    assert retry.is_exhausted()
+
+
+def test_notify_ignores_retry_after_and_stops_at_deadline(monkeypatch):
+    hits = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            hits.append(1)
+            self.rfile.read(int(self.headers["Content-Length"]))
+            self.send_response(503)
+            self.send_header("Retry-After", "86400")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    adapter = app_module.HTTP.get_adapter("http://127.0.0.1")
+    monkeypatch.setattr(
+        adapter, "max_retries", app_module._retry.new(deadline_seconds=1, deadline=None)
+    )
+    try:
+        start = time.monotonic()
+        url = f"http://127.0.0.1:{server.server_port}/"
+        assert app_module.notify_evaluation(url, {}) is False
+        elapsed = time.monotonic() - start
+    finally:
+        server.shutdown()
+    assert len(hits) >= 2
+    assert elapsed < 5
+
+
+# -------------------
+# Test echoed fields
+# -------------------
+
+
+def test_non_json_content_type_rejected(client):
+    body = json.dumps(make_task())
+    resp = client.post("/api", data=body, content_type="text/plain")
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "invalid json"}
+
+
+@pytest.mark.parametrize("round_value", [1e20, -1, 0, 2**63, "abc", None, [1]])
+def test_invalid_round_rejected(client, round_value):
+    resp = client.post("/api", json=make_task(round=round_value))
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "invalid round"}
+    client.mock_notify.assert_not_called()
+
+
+def test_numeric_string_round_accepted(client):
+    resp = client.post("/api", json=make_task(round="2"))
+    assert resp.status_code == 200
+    assert resp.get_json()["round"] == 2
+
+
+def test_deeply_nested_task_rejected(client):
+    task = "x"
+    for _ in range(300):
+        task = [task]
+    data = make_task()
+    del data["task"]
+    body = json.dumps(data)[:-1] + ', "task": ' + json.dumps(task) + "}"
+    resp = client.post("/api", data=body, content_type="application/json")
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "invalid task"}
+
+
+@pytest.mark.parametrize("task", [123, None, {"a": 1}])
+def test_non_string_task_rejected(client, task):
+    resp = client.post("/api", json=make_task(task=task))
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "invalid task"}
+
+
+# -------------------
+# Test app_local_pipeline secret check
+# -------------------
+
+
+@pytest.fixture
+def local_client(monkeypatch):
+    import app_local_pipeline
+
+    monkeypatch.setattr(app_local_pipeline, "PROJECT_SECRET", "123")
+    monkeypatch.setattr(app_local_pipeline, "LOCAL_MODE", False)
+    with patch("app_local_pipeline.notify_evaluation"):
+        yield app_local_pipeline.app.test_client()
+
+
+@pytest.mark.parametrize(
+    "secret, status", [("123", 200), (123, 400), ("124", 400), (None, 400)]
+)
+def test_local_pipeline_secret_check(local_client, secret, status):
+    resp = local_client.post("/api", json=make_task(secret=secret))
+    assert resp.status_code == status